@@ -1,34 +1,289 @@
 import pandas as pd
+import numpy as np
 import itertools
+import functools
+import hashlib
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+from numba import njit, prange, set_num_threads
 
-# --- Step 0: Deuces poker hand evaluator ---
-from deuces import Card, Evaluator
+# --- Step 0: Cactus-Kev poker hand evaluator ---
+# Every card is a 32-bit int laid out as  xxxbbbbb bbbbbbbb cdhsrrrr xxpppppp
+#   b = one bit per rank (2..A), cdhs = suit bit, r = rank index (0..12), p = rank prime
+# Hand ranks run from 1 (royal flush) to 7462 (7-5-4-3-2 offsuit); lower is better.
+RANK_CHARS = "23456789TJQKA"
+PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41]
+SUIT_BITS = {'s': 1, 'h': 2, 'd': 4, 'c': 8}
 
-evaluator = Evaluator()
+# Upper rank bound of each hand class
+MAX_STRAIGHT_FLUSH = 10
+MAX_FOUR_OF_A_KIND = 166
+MAX_FULL_HOUSE = 322
+MAX_FLUSH = 1599
+MAX_STRAIGHT = 1609
+MAX_THREE_OF_A_KIND = 2467
+MAX_TWO_PAIR = 3325
+MAX_PAIR = 6185
+MAX_HIGH_CARD = 7462
 
-# Helper: convert 'AS', '10H', etc. to Deuces format
-def to_deuces(card_str):
+RANK_CLASSES = [
+    (MAX_STRAIGHT_FLUSH, "Straight Flush"),
+    (MAX_FOUR_OF_A_KIND, "Four of a Kind"),
+    (MAX_FULL_HOUSE, "Full House"),
+    (MAX_FLUSH, "Flush"),
+    (MAX_STRAIGHT, "Straight"),
+    (MAX_THREE_OF_A_KIND, "Three of a Kind"),
+    (MAX_TWO_PAIR, "Two Pair"),
+    (MAX_PAIR, "Pair"),
+    (MAX_HIGH_CARD, "High Card"),
+]
+
+# Rank-bit patterns of the ten straights, best (A-high) to worst (5-high wheel)
+STRAIGHTS = [0x1F00, 0xF80, 0x7C0, 0x3E0, 0x1F0, 0xF8, 0x7C, 0x3E, 0x1F, 0x100F]
+
+# Helper: convert 'AS', '10H', etc. to a Cactus-Kev card int
+# Only a handful of distinct spellings ever occur, so parse each one once
+@functools.lru_cache(maxsize=None)
+def to_card_int(card_str):
     rank_map = {'A': 'A', 'K': 'K', 'Q': 'Q', 'J': 'J', 'T': 'T', '10': 'T', '9': '9', '8': '8', '7': '7', '6': '6', '5': '5', '4': '4', '3': '3', '2': '2'}
     suit_map = {'S': 's', 'H': 'h', 'D': 'd', 'C': 'c', 's': 's', 'h': 'h', 'd': 'd', 'c': 'c'}
     card_str = card_str.strip()
     suit = suit_map[card_str[-1]]
     rank = card_str[:-1]
     rank = rank_map[rank] if rank in rank_map else rank
-    return Card.new(rank + suit)
+    r = RANK_CHARS.index(rank)
+    return (1 << (16 + r)) | (SUIT_BITS[suit] << 12) | (r << 8) | PRIMES[r]
+
+# Build the lookup tables for all 7462 hand equivalence classes
+def build_tables():
+    """
+    Returns (flush_lookup, unique5_lookup, product_lookup).
+    flush_lookup / unique5_lookup are indexed by the 13-bit OR of the rank bits,
+    product_lookup maps the product of the five rank primes to a rank for paired hands.
+    """
+    flush_lookup = np.zeros(8192, dtype=np.uint16)
+    unique5_lookup = np.zeros(8192, dtype=np.uint16)
+    product_lookup = {}
+
+    # Five distinct ranks: straights first, then every other pattern from best to worst
+    patterns = sorted((sum(1 << r for r in combo) for combo in itertools.combinations(range(13), 5)), reverse=True)
+    patterns = [bits for bits in patterns if bits not in STRAIGHTS]
+    for i, bits in enumerate(STRAIGHTS):
+        flush_lookup[bits] = 1 + i
+        unique5_lookup[bits] = MAX_FLUSH + 1 + i
+    for i, bits in enumerate(patterns):
+        flush_lookup[bits] = MAX_FULL_HOUSE + 1 + i
+        unique5_lookup[bits] = MAX_PAIR + 1 + i
+
+    # Paired hands, keyed by prime product, each class ordered from best to worst
+    desc = list(range(12, -1, -1))
+    rank = MAX_STRAIGHT_FLUSH + 1
+    for quad in desc:
+        for kicker in desc:
+            if kicker != quad:
+                product_lookup[PRIMES[quad] ** 4 * PRIMES[kicker]] = rank
+                rank += 1
+    for trips in desc:
+        for pair in desc:
+            if pair != trips:
+                product_lookup[PRIMES[trips] ** 3 * PRIMES[pair] ** 2] = rank
+                rank += 1
+
+    rank = MAX_STRAIGHT + 1
+    for trips in desc:
+        kickers = [r for r in desc if r != trips]
+        for k1, k2 in itertools.combinations(kickers, 2):
+            product_lookup[PRIMES[trips] ** 3 * PRIMES[k1] * PRIMES[k2]] = rank
+            rank += 1
+    for high, low in itertools.combinations(desc, 2):
+        for kicker in desc:
+            if kicker != high and kicker != low:
+                product_lookup[PRIMES[high] ** 2 * PRIMES[low] ** 2 * PRIMES[kicker]] = rank
+                rank += 1
+    for pair in desc:
+        kickers = [r for r in desc if r != pair]
+        for k1, k2, k3 in itertools.combinations(kickers, 3):
+            product_lookup[PRIMES[pair] ** 2 * PRIMES[k1] * PRIMES[k2] * PRIMES[k3]] = rank
+            rank += 1
+
+    return flush_lookup, unique5_lookup, product_lookup
+
+# Paul Senzee's mixing function for the prime products: returns (slot, bucket)
+@njit(cache=True)
+def _mix_product(u):
+    u = (u + 0xE91AAA35) & 0xFFFFFFFF
+    u ^= u >> 16
+    u = (u + (u << 8)) & 0xFFFFFFFF
+    u ^= u >> 4
+    bucket = (u >> 8) & 0x1FF
+    slot = ((u + (u << 2)) & 0xFFFFFFFF) >> 19
+    return slot, bucket
+
+# Perfect hash of a paired hand's prime product into hash_values
+@njit(cache=True)
+def _product_hash(product, hash_adjust):
+    slot, bucket = _mix_product(product)
+    return slot ^ hash_adjust[bucket]
+
+# Build a collision-free table for the paired-hand prime products
+def build_product_hash(product_lookup):
+    """
+    Returns (hash_adjust, hash_values): each product mixes to a 13-bit slot and a 9-bit bucket,
+    and hash_adjust[bucket] is XORed into the slot so that no two products share a slot.
+    Buckets are placed largest first, each taking the first adjustment that fits.
+    """
+    buckets = {}
+    for product, rank in product_lookup.items():
+        slot, bucket = _mix_product(product)
+        buckets.setdefault(bucket, []).append((slot, rank))
+
+    hash_adjust = np.zeros(512, dtype=np.uint16)
+    hash_values = np.zeros(8192, dtype=np.uint16)
+    occupied = np.zeros(8192, dtype=bool)
+    candidates = np.arange(8192)[:, None]
+    for bucket, entries in sorted(buckets.items(), key=lambda item: -len(item[1])):
+        slots = np.array([slot for slot, _ in entries])
+        # XOR with one adjustment keeps distinct slots distinct, so only clashes with
+        # already placed buckets (or identical slots within this one) can fail
+        fits = ~occupied[candidates ^ slots[None, :]].any(axis=1)
+        adjust = int(np.argmax(fits))
+        if len(set(slots.tolist())) != len(slots) or not fits[adjust]:
+            raise RuntimeError(f"No perfect-hash adjustment for bucket {bucket}")
+        hash_adjust[bucket] = adjust
+        for slot, rank in entries:
+            hash_values[slot ^ adjust] = rank
+            occupied[slot ^ adjust] = True
+
+    return hash_adjust, hash_values
+
+TABLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cactus_tables")
+# Bump whenever build_tables / build_product_hash change what they produce
+TABLES_VERSION = 1
+TABLE_LAYOUT = {
+    "flush_lookup": ((8192,), np.uint16),
+    "unique5_lookup": ((8192,), np.uint16),
+    "hash_adjust": ((512,), np.uint16),
+    "hash_values": ((8192,), np.uint16),
+}
+
+# SHA-256 of a table's raw bytes, recorded next to the saved files
+def _table_digest(table):
+    return hashlib.sha256(np.ascontiguousarray(table).tobytes()).hexdigest()
+
+# Memory-map the saved tables, or return None if any is missing, stale or corrupt
+def _load_tables(path):
+    try:
+        with open(os.path.join(path, f"checksums.v{TABLES_VERSION}.txt")) as fh:
+            digests = dict(line.split() for line in fh if line.strip())
+        tables = []
+        for name, (shape, dtype) in TABLE_LAYOUT.items():
+            table = np.load(os.path.join(path, f"{name}.v{TABLES_VERSION}.npy"), mmap_mode="r")
+            if table.shape != shape or table.dtype != dtype or _table_digest(table) != digests.get(name):
+                return None
+            tables.append(table)
+    except (OSError, ValueError, EOFError):
+        return None
+    return tuple(tables)
+
+# Load the evaluator tables from disk, building and saving them when missing or invalid
+def build_or_load_tables(path=TABLES_DIR):
+    """
+    Returns (flush_lookup, unique5_lookup, hash_adjust, hash_values).
+    Each table is kept as its own .npy file and memory-mapped read-only, so every process
+    that loads them shares the same physical pages. Files carry TABLES_VERSION in their
+    names and are checked against a checksum file; anything that does not match is rebuilt.
+    If the directory cannot be written, the freshly built tables are used from memory.
+    """
+    tables = _load_tables(path)
+    if tables is not None:
+        return tables
+
+    flush_lookup, unique5_lookup, product_lookup = build_tables()
+    hash_adjust, hash_values = build_product_hash(product_lookup)
+    tables = (flush_lookup, unique5_lookup, hash_adjust, hash_values)
+    try:
+        os.makedirs(path, exist_ok=True)
+        # Write then rename so a concurrent run never maps a half-written file;
+        # the checksum file goes last so it only ever vouches for complete tables
+        for name, table in zip(TABLE_LAYOUT, tables):
+            f = os.path.join(path, f"{name}.v{TABLES_VERSION}.npy")
+            tmp = f"{f}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as fh:
+                np.save(fh, table)
+            os.replace(tmp, f)
+        f = os.path.join(path, f"checksums.v{TABLES_VERSION}.txt")
+        tmp = f"{f}.{os.getpid()}.tmp"
+        with open(tmp, "w") as fh:
+            fh.writelines(f"{name} {_table_digest(table)}\n" for name, table in zip(TABLE_LAYOUT, tables))
+        os.replace(tmp, f)
+    except OSError:
+        return tables
+    return _load_tables(path) or tables
 
-# Evaluate a hand of 5 or 7 cards
+flush_lookup, unique5_lookup, hash_adjust, hash_values = build_or_load_tables()
+
+# The evaluator tables in the argument order of _eval5 / _eval7, for calls from Python
+EVAL_TABLES = (flush_lookup, unique5_lookup, hash_adjust, hash_values)
+
+# Compiled rank lookup from a hand's OR of card bits, AND of card bits and prime product
+@njit(cache=True)
+def _rank_from_parts(bits_or, bits_and, product, flush_lut, unique_lut, hash_adjust, hash_values):
+    q = bits_or >> 16
+    if bits_and & 0xF000:
+        return flush_lut[q]
+    rank = unique_lut[q]
+    if rank:
+        return rank
+    return hash_values[_product_hash(product, hash_adjust)]
+
+# Evaluate exactly five card ints; the tables are passed in so Numba does not freeze them as constants
+@njit(cache=True)
+def _eval5(c0, c1, c2, c3, c4, flush_lut, unique_lut, hash_adjust, hash_values):
+    product = (c0 & 0xFF) * (c1 & 0xFF) * (c2 & 0xFF) * (c3 & 0xFF) * (c4 & 0xFF)
+    return _rank_from_parts(c0 | c1 | c2 | c3 | c4, c0 & c1 & c2 & c3 & c4, product,
+                            flush_lut, unique_lut, hash_adjust, hash_values)
+
+# Evaluate two hole cards plus a five-card board as the best of the 21 five-card subsets,
+# written out in full so there is no length check, list or subset table
+@njit(cache=True)
+def _eval7(p0, p1, b0, b1, b2, b3, b4, flush_lut, unique_lut, hash_adjust, hash_values):
+    def rank(c0, c1, c2, c3, c4):
+        return _eval5(c0, c1, c2, c3, c4, flush_lut, unique_lut, hash_adjust, hash_values)
+
+    # Board only
+    best = rank(b0, b1, b2, b3, b4)
+    # One hole card and four board cards
+    best = min(best, rank(p0, b1, b2, b3, b4), rank(p0, b0, b2, b3, b4), rank(p0, b0, b1, b3, b4),
+               rank(p0, b0, b1, b2, b4), rank(p0, b0, b1, b2, b3))
+    best = min(best, rank(p1, b1, b2, b3, b4), rank(p1, b0, b2, b3, b4), rank(p1, b0, b1, b3, b4),
+               rank(p1, b0, b1, b2, b4), rank(p1, b0, b1, b2, b3))
+    # Both hole cards and three board cards
+    best = min(best, rank(p0, p1, b0, b1, b2), rank(p0, p1, b0, b1, b3), rank(p0, p1, b0, b1, b4),
+               rank(p0, p1, b0, b2, b3), rank(p0, p1, b0, b2, b4), rank(p0, p1, b0, b3, b4))
+    best = min(best, rank(p0, p1, b1, b2, b3), rank(p0, p1, b1, b2, b4), rank(p0, p1, b1, b3, b4),
+               rank(p0, p1, b2, b3, b4))
+    return best
+
+# Readable hand class for an already computed rank
+def rank_class_string(rank):
+    for max_rank, name in RANK_CLASSES:
+        if rank <= max_rank:
+            return name
+    raise ValueError(f"Invalid hand rank {rank}")
+
+# Evaluate a hand of 5 or 7 cards (string interface; hot paths call _eval5 / _eval7 directly)
 def evaluate_hand(card_strs):
     try:
-        cards = [to_deuces(c) for c in card_strs]
-        # Debug: print the cards being evaluated
-        # print(f"Debug: Evaluating cards: {card_strs} -> {[Card.print_pretty_card(c) for c in cards]}")
-        
+        cards = [to_card_int(c) for c in card_strs]
+
         if len(cards) == 5:
-            # For 5-card hands, evaluate directly
-            return evaluator.evaluate([], cards)  # No hole cards, all board
+            return _eval5(*cards, *EVAL_TABLES)
         elif len(cards) == 7:
-            # For 7-card hands, use hole cards + board format (player 2 + river 5)
-            return evaluator.evaluate(cards[:2], cards[2:])  # [hole, board]
+            return _eval7(*cards, *EVAL_TABLES)
         else:
             raise ValueError(f"Hand must have 5 or 7 cards, got {len(cards)}")
     except Exception as e:
@@ -38,86 +293,68 @@ def evaluate_hand(card_strs):
 
 # Optional: readable hand class for 5 or 7 card hands
 def hand_class(card_strs):
-    cards = [to_deuces(c) for c in card_strs]
-    if len(cards) == 5:
-        return evaluator.class_to_string(evaluator.get_rank_class(evaluator.evaluate([], cards)))
-    elif len(cards) == 7:
-        return evaluator.class_to_string(evaluator.get_rank_class(evaluator.evaluate(cards[:2], cards[2:])))
-    else:
-        raise ValueError(f"Hand must have 5 or 7 cards, got {len(cards)}")
+    if len(card_strs) not in (5, 7):
+        raise ValueError(f"Hand must have 5 or 7 cards, got {len(card_strs)}")
+    return rank_class_string(evaluate_hand(card_strs))
 
-# Check how much a player's hand improves with river cards
-def check_hand_improvement(player_cards, river_cards):
+# Improvement of every known player on a given river, in record order (no sorting)
+def _compute_improvements(records, river_cards):
     """
-    Returns improvement metrics for a player's hand with given river cards.
-    Lower scores are better in deuces, so improvement = worse_score - better_score
+    Returns (known, improvement, player_score): the records of players with known cards
+    and two parallel int arrays for them.
     """
-    # Player hand: evaluate player cards + river
-    full_hand = player_cards + river_cards
-    player_score = evaluate_hand(full_hand)
-    # Baseline: evaluate just the river cards as a 5-card hand (no hole cards)
-    baseline_score = evaluate_hand(river_cards)  # Use our updated function for 5-card evaluation
-    
-    # Improvement (positive = better than baseline)
-    improvement = baseline_score - player_score
+    # The river-only rank is the same for every player
+    b0, b1, b2, b3, b4 = (to_card_int(c) for c in river_cards)
+    baseline_score = _eval5(b0, b1, b2, b3, b4, *EVAL_TABLES)
     
-    return {
-        'baseline_score': baseline_score,
-        'player_score': player_score, 
-        'improvement': improvement,
-        'hand_type': hand_class(full_hand)
-    }
+    # Skip players with unknown cards
+    known = [record for record in records if record[1] and record[2]]
+    player_score = np.array([_eval7(c1, c2, b0, b1, b2, b3, b4, *EVAL_TABLES) for _, c1, c2, _ in known], dtype=np.int64)
+    return known, baseline_score - player_score, player_score
 
-# Analyze all players for a given river
-# Analyze all players for a given river
-def analyze_players_for_river(players_df, river_cards):
-    """Analyze how each player performs with the given river cards"""
-    results = []
-    
-    for _, player_row in players_df.iterrows():
-        player_cards = [str(player_row["Card 1"]).strip(), str(player_row["Card 2"]).strip()]
-        player_no = player_row["Player No"]
-        
-        # Skip players with unknown cards
-        if '??' in player_cards:
-            continue
-        
-        improvement_data = check_hand_improvement(player_cards, river_cards)
-        
-        results.append({
+# Per-player report dicts for a river, in record order (no sorting)
+def _analysis_entries(known, improvement, player_score):
+    return [
+        {
             'player_no': player_no,
-            'player_cards': player_cards,
-            'improvement': improvement_data['improvement'],
-            'player_score': improvement_data['player_score'],
-            'hand_type': improvement_data['hand_type']
-        })
+            'player_cards': [INT_CARD[c1], INT_CARD[c2]],
+            'improvement': player_improvement,
+            'player_score': score
+        }
+        for (player_no, c1, c2, _), player_improvement, score in zip(known, improvement.tolist(), player_score.tolist())
+    ]
+
+# Analyze all players for a given river
+def analyze_players_for_river(records, river_cards):
+    """
+    Analyze how each player performs with the given river cards, for reporting.
+    records: players_to_records output, (player_no, card 1 int, card 2 int, estimation) tuples.
+    """
+    known, improvement, player_score = _compute_improvements(records, river_cards)
+    results = _analysis_entries(known, improvement, player_score)
     
     # Sort by improvement (highest improvement first)
-    results.sort(key=lambda x: x['improvement'], reverse=True)
-    return results
+    order = np.argsort(-improvement, kind="stable")
+    return [results[i] for i in order]
 
 # Validate river against player evaluations
-def validate_river_against_evaluations(players_df, river_cards):
+def validate_river_against_evaluations(records, river_cards):
     """
     Check if a river combination is valid based on player evaluations.
     Valid if: players with no improvement are sad (-1) and players with improvement are happy (1)
     Players with 0 evaluation are neutral/unknown
+    Players are reported in record order; use analyze_players_for_river for a ranked view.
     """
-    analysis = analyze_players_for_river(players_df, river_cards)
-    
-    # Create lookup for player evaluations
-    player_evaluations = {}
-    for _, row in players_df.iterrows():
-        player_evaluations[row["Player No"]] = row["Estimation"]
+    known, improvements, player_scores = _compute_improvements(records, river_cards)
+    analysis = _analysis_entries(known, improvements, player_scores)
     
     conflicts = []
     matches = []
     neutral_count = 0
     
-    for result in analysis:
+    for (_, _, _, evaluation), result in zip(known, analysis):
         player_no = result['player_no']
         improvement = result['improvement']
-        evaluation = player_evaluations[player_no]
         
         # Determine if player improved (improvement > 0)
         improved = improvement > 0
@@ -148,26 +385,234 @@ def validate_river_against_evaluations(players_df, river_cards):
         'analysis': analysis
     }
 
+# One-hot suit bit of a card (1, 2, 4 or 8) raised to the 4th power gives 1 << (4 * suit index),
+# i.e. a +1 in that suit's nibble of a packed SWAR suit counter
+@njit(cache=True)
+def _suit_nibble(card):
+    suit = (card >> 12) & 0xF
+    suit *= suit
+    return suit * suit
+
+# Board positions of the 4- and 3-card board subsets. With the river fixed, a 7-card hand's
+# 21 five-card subsets are the whole board, a 4-card subset plus one hole card (10),
+# or a 3-card subset plus both hole cards (10).
+BOARD_4_OF_5 = np.array(list(itertools.combinations(range(5), 4)), dtype=np.int8)
+BOARD_3_OF_5 = np.array(list(itertools.combinations(range(5), 3)), dtype=np.int8)
+
+# Compiled form of validate_river_against_evaluations over every river at once
+@njit(parallel=True, cache=True)
+def scan_rivers(river_masks, bit_cards, player_cards, estimations, board4, board3,
+                flush_lut, unique_lut, hash_adjust, hash_values):
+    """
+    river_masks: (N,) 5-bit deck masks, bit_cards: BIT_CARDS, player_cards: (P, 2) hole-card ints,
+    board4 / board3: the BOARD_4_OF_5 / BOARD_3_OF_5 subset tables.
+    Players are checked in order and a river is dropped at its first conflict, so it runs
+    fastest with the players most likely to conflict first; neutral (0) players are skipped
+    wherever they appear.
+    Returns a uint8 (N,) mask, 1 where no player's improvement conflicts with their estimation.
+    """
+    num_rivers = river_masks.shape[0]
+    valid_mask = np.zeros(num_rivers, dtype=np.uint8)
+    for i in prange(num_rivers):
+        # Unpack the mask one 13-bit suit chunk at a time; each chunk's popcount is that
+        # suit's count on the board, packed into the SWAR suit counter as it goes
+        mask = river_masks[i]
+        board = np.empty(5, dtype=np.uint32)
+        board_suits = 0
+        n = 0
+        for s in range(4):
+            chunk = (mask >> (13 * s)) & 0x1FFF
+            count = 0
+            for r in range(13):
+                if chunk >> r & 1:
+                    board[n] = bit_cards[13 * s + r]
+                    n += 1
+                    count += 1
+            board_suits += count << (4 * s)
+        baseline = _eval5(board[0], board[1], board[2], board[3], board[4],
+                          flush_lut, unique_lut, hash_adjust, hash_values)
+
+        # OR / AND / prime product of each board subset, shared by every player on this river
+        or4 = np.empty(5, dtype=np.uint32)
+        and4 = np.empty(5, dtype=np.uint32)
+        prod4 = np.empty(5, dtype=np.int64)
+        for k in range(5):
+            a, b, c, d = board[board4[k, 0]], board[board4[k, 1]], board[board4[k, 2]], board[board4[k, 3]]
+            or4[k] = a | b | c | d
+            and4[k] = a & b & c & d
+            prod4[k] = (a & 0xFF) * (b & 0xFF) * (c & 0xFF) * (d & 0xFF)
+        or3 = np.empty(10, dtype=np.uint32)
+        and3 = np.empty(10, dtype=np.uint32)
+        prod3 = np.empty(10, dtype=np.int64)
+        for k in range(10):
+            a, b, c = board[board3[k, 0]], board[board3[k, 1]], board[board3[k, 2]]
+            or3[k] = a | b | c
+            and3[k] = a & b & c
+            prod3[k] = (a & 0xFF) * (b & 0xFF) * (c & 0xFF)
+
+        valid = True
+        for p in range(player_cards.shape[0]):
+            if estimations[p] == 0:
+                continue
+
+            p0 = player_cards[p, 0]
+            p1 = player_cards[p, 1]
+
+            # SWAR flush test over all 7 cards: +3 sets a nibble's top bit only when that suit
+            # has 5+ cards. Without one no subset can be a flush, so the AND terms are masked off.
+            suits = board_suits + _suit_nibble(p0) + _suit_nibble(p1)
+            flush_mask = 0xF000 if (suits + 0x3333) & 0x8888 else 0
+
+            # The board-only subset is the baseline; fold the hole cards into the rest
+            best = baseline
+            for h in range(2):
+                hole = player_cards[p, h]
+                for k in range(5):
+                    rank = _rank_from_parts(or4[k] | hole, and4[k] & hole & flush_mask, prod4[k] * (hole & 0xFF),
+                                            flush_lut, unique_lut, hash_adjust, hash_values)
+                    if rank < best:
+                        best = rank
+            hole_or = p0 | p1
+            hole_and = p0 & p1 & flush_mask
+            hole_prod = (p0 & 0xFF) * (p1 & 0xFF)
+            for k in range(10):
+                rank = _rank_from_parts(or3[k] | hole_or, and3[k] & hole_and, prod3[k] * hole_prod,
+                                        flush_lut, unique_lut, hash_adjust, hash_values)
+                if rank < best:
+                    best = rank
+
+            improved = baseline > best
+            if improved != (estimations[p] == 1):
+                valid = False
+                break
+
+        if valid:
+            valid_mask[i] = 1
+    return valid_mask
+
+# Every 5-card river drawn from the remaining deck, as a 52-bit deck mask (see BIT_CARDS).
+# Gosper's hack walks the 5-of-n subsets of the n remaining cards in local bit space, each step
+# jumping straight to the next larger integer with five set bits; byte_bits[k, b] holds the deck
+# bits of the cards picked by byte b of the local mask's k-th byte, so mapping is a few lookups
+@njit(cache=True)
+def _river_masks(byte_bits, num_rivers):
+    masks = np.empty(num_rivers, dtype=np.int64)
+    local = (1 << 5) - 1
+    for i in range(num_rivers):
+        mask = 0
+        for k in range(byte_bits.shape[0]):
+            mask |= byte_bits[k, (local >> (8 * k)) & 0xFF]
+        masks[i] = mask
+        low = local & -local
+        ripple = local + low
+        local = (((local ^ ripple) >> 2) // low) | ripple
+    return masks
+
+# Deck masks of every river drawn from remaining_deck
+def river_masks(remaining_deck):
+    byte_bits = np.zeros(((len(remaining_deck) + 7) // 8, 256), dtype=np.int64)
+    byte_values = np.arange(256)
+    for j, card in enumerate(remaining_deck):
+        byte_bits[j >> 3, (byte_values >> (j & 7)) & 1 == 1] |= 1 << CARD_BIT[card]
+    return _river_masks(byte_bits, math.comb(len(remaining_deck), 5))
+
+# Card strings of a river mask, in deck order
+def mask_cards(mask):
+    return [card for card in deck if mask >> CARD_BIT[card] & 1]
+
+# Per-process state of the multiprocess scan: the attached shared blocks and array views
+_worker_blocks = []
+_worker_arrays = []
+
+# Pool initializer: attach the shared river masks once per worker
+def _init_scan_worker(specs):
+    # Parallelism comes from the processes, so keep each kernel on one thread
+    set_num_threads(1)
+    for name, shape, dtype in specs:
+        block = shared_memory.SharedMemory(name=name)
+        _worker_blocks.append(block)
+        _worker_arrays.append(np.ndarray(shape, dtype=dtype, buffer=block.buf))
+
+# Scan rivers [start, stop) in a worker and return the global indices of the valid ones
+def _scan_chunk(start, stop, players_cards, estimations):
+    masks = _worker_arrays[0]
+    valid_mask = scan_rivers(masks[start:stop], BIT_CARDS, players_cards, estimations,
+                             BOARD_4_OF_5, BOARD_3_OF_5, flush_lookup, unique5_lookup, hash_adjust, hash_values)
+    return start + np.flatnonzero(valid_mask)
+
+# Run scan_rivers over chunks of rivers in a process pool
+def scan_rivers_multiprocess(masks, players_cards, estimations, processes=None):
+    """
+    Splits the rivers into one contiguous range per process. The river masks are placed in
+    shared memory instead of being pickled to every worker; the lookup tables are already
+    shared through the memory-mapped files from build_or_load_tables.
+    Returns the sorted indices of the valid rivers.
+    """
+    processes = processes or os.cpu_count()
+    blocks = []
+    try:
+        specs = []
+        for array in (masks,):
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            specs.append((block.name, array.shape, array.dtype.str))
+
+        bounds = np.linspace(0, len(masks), processes + 1).astype(np.int64).tolist()
+        # Spawn rather than fork: forking after the prange kernel has started Numba's thread
+        # pool can deadlock or abort the workers. Spawned workers re-import this module and
+        # map the table files from build_or_load_tables.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(processes, mp_context=context, initializer=_init_scan_worker,
+                                 initargs=(specs,)) as pool:
+            futures = [
+                pool.submit(_scan_chunk, start, stop, players_cards, estimations)
+                for start, stop in zip(bounds[:-1], bounds[1:])
+            ]
+            return np.concatenate([future.result() for future in futures])
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
 # Find all valid rivers
-def find_valid_rivers(players_df, river_combos, max_to_check=1000):
-    """Find river combinations that match the player evaluations"""
+def find_valid_rivers(records, remaining_deck, max_to_check=None, processes=None):
+    """
+    Find river combinations that match the player evaluations.
+    records: players_to_records output.
+    processes > 1 splits the scan over a process pool instead of Numba's threads.
+    """
+    # Known players only: (P, 2) hole-card ints and a matching estimation vector
+    known = [(c1, c2, est) for _, c1, c2, est in records if c1 and c2]
+    players_cards = np.array([[c1, c2] for c1, c2, _ in known], dtype=np.uint32).reshape(-1, 2)
+    estimations = np.array([est for _, _, est in known], dtype=np.int8)
+
+    # Seat the constraints for early exit: sad players first (their hole cards play on most
+    # rivers, so they conflict most often), then happy players, then neutral ones
+    order = np.argsort(np.where(estimations == 0, 2, estimations), kind="stable")
+    players_cards = players_cards[order]
+    estimations = estimations[order]
+
+    masks = river_masks(remaining_deck)[:max_to_check]
+
+    print(f"Checking {len(masks):,} river combinations...")
+
+    if processes is not None and processes > 1:
+        valid_indices = scan_rivers_multiprocess(masks, players_cards, estimations, processes)
+    else:
+        valid_mask = scan_rivers(masks, BIT_CARDS, players_cards, estimations, BOARD_4_OF_5, BOARD_3_OF_5,
+                                 flush_lookup, unique5_lookup, hash_adjust, hash_values)
+        valid_indices = np.flatnonzero(valid_mask)
+
     valid_rivers = []
-    
-    print(f"Checking first {min(max_to_check, len(river_combos))} river combinations...")
-    
-    for i, river in enumerate(river_combos[:max_to_check]):
-        if i % 10000 == 0:
-            print(f"Checked {i:,} rivers, found {len(valid_rivers)} valid so far...")
-            
-        validation = validate_river_against_evaluations(players_df, list(river))
-        
-        if validation['is_valid']:
-            valid_rivers.append({
-                'river': list(river),
-                'validation': validation
-            })
-    
-    print(f"Found {len(valid_rivers)} valid rivers out of {min(max_to_check, len(river_combos))} checked")
+    for i in valid_indices:
+        river = mask_cards(masks[i])
+        valid_rivers.append({
+            'river': river,
+            'validation': validate_river_against_evaluations(records, river)
+        })
+
+    print(f"Found {len(valid_rivers)} valid rivers out of {len(masks):,} checked")
     return valid_rivers
 
 # --- Step 1: Build a deck ---
@@ -176,23 +621,54 @@ ranks = ["A", "K", "Q", "J", "10", "9", "8", "7", "6", "5", "4", "3", "2"]
 
 deck = [r + s for r, s in itertools.product(ranks, suits)]
 
+# Card string -> Cactus-Kev int, computed once for the whole deck (this also warms to_card_int)
+CARD_INT = {card: to_card_int(card) for card in deck}
+INT_CARD = {card_int: card for card, card_int in CARD_INT.items()}
+
+# River masks give each card bit 13 * suit + rank (2 = 0 .. A = 12), so every suit is a 13-bit
+# chunk laid out like a card int's rank bits; BIT_CARDS maps a bit back to its card int
+BIT_CARDS = np.array([CARD_INT[r + s] for s in suits for r in reversed(ranks)], dtype=np.uint32)
+CARD_BIT = {INT_CARD[card_int]: bit for bit, card_int in enumerate(BIT_CARDS.tolist())}
+
 # --- Step 2: Load CSV of players ---
 def load_players(csv_path: str):
     df = pd.read_csv(csv_path)
+    # Normalize card cells (' 4c' -> '4c') once so later code can use them as-is
+    for col in ("Card 1", "Card 2"):
+        df[col] = df[col].astype(str).str.strip()
     return df
 
+# Struct-of-arrays view of the players for positional access outside pandas
+def player_arrays(players_df):
+    """
+    Returns a namespace with no / c1 / c2 / est arrays (card ints are 0 for '??')
+    and idx_of_player mapping a player number to its position.
+    """
+    cards = players_df[["Card 1", "Card 2"]].to_numpy()
+    card_ints = np.array([[0 if c == "??" else to_card_int(c) for c in row] for row in cards], dtype=np.uint32).reshape(-1, 2)
+    player_nos = players_df["Player No"].to_numpy()
+    return SimpleNamespace(
+        no=player_nos,
+        c1=card_ints[:, 0],
+        c2=card_ints[:, 1],
+        est=players_df["Estimation"].to_numpy(np.int8),
+        idx_of_player={no: i for i, no in enumerate(player_nos.tolist())},
+    )
+
+# Plain per-player tuples for the per-river code, so it never touches pandas
+def players_to_records(players_df):
+    """Returns [(player_no, card 1 int, card 2 int, estimation), ...] with 0 for '??' cards."""
+    players = player_arrays(players_df)
+    return list(zip(players.no.tolist(), players.c1.tolist(), players.c2.tolist(), players.est.tolist()))
+
 # --- Step 3: Build known / unknown card sets ---
 def build_exclusion_table(players_df):
-    known_cards = set()
-    unknowns = []
+    # Flatten to [p0 card 1, p0 card 2, p1 card 1, ...] in a single pass
+    cards = players_df[["Card 1", "Card 2"]].to_numpy().ravel()
+    known_cards = set(cards[cards != "??"].tolist())
 
-    for _, row in players_df.iterrows():
-        for col in ["Card 1", "Card 2"]:
-            card = str(row[col]).strip()
-            if card != "??":
-                known_cards.add(card)
-            else:
-                unknowns.append((row["Player No"], col))
+    player_nos = players_df["Player No"].tolist()
+    unknowns = [(player_nos[i // 2], f"Card {i % 2 + 1}") for i in np.flatnonzero(cards == "??")]
 
     remaining_deck = [c for c in deck if c not in known_cards]
 
@@ -207,6 +683,8 @@ if __name__ == "__main__":
     # Example CSV path
     csv_path = "player_hands.csv"
     players_df = load_players(csv_path)
+    players = player_arrays(players_df)
+    records = players_to_records(players_df)
     table = build_exclusion_table(players_df)
 
     print("Known cards:", table["known_cards"])
@@ -214,30 +692,29 @@ if __name__ == "__main__":
     print("Remaining deck (available):", table["remaining_deck"])
 
     # --- Step 4: Generate all possible 5-card river combinations ---
-    from itertools import combinations
-
-    river_combos = list(combinations(table["remaining_deck"], 5))
-    print(f"Total possible river combinations: {len(river_combos):,}")
+    remaining_deck = table["remaining_deck"]
+    masks = river_masks(remaining_deck)
+    print(f"Total possible river combinations: {len(masks):,}")
 
     # --- Example: Evaluate a sample hand (first player, first river combo) ---
     player_row = players_df.iloc[0]
-    player_cards = [str(player_row["Card 1"]).strip(), str(player_row["Card 2"]).strip()]
+    player_cards = [player_row["Card 1"], player_row["Card 2"]]
     # Use first river combo as example
-    river = list(river_combos[0])
+    river = mask_cards(masks[0])
     full_hand = player_cards + river
     score = evaluate_hand(full_hand)
-    handtype = hand_class(full_hand)
+    handtype = rank_class_string(score)
     print(f"Player hand: {player_cards}, River: {river}")
     print(f"Hand score (lower is better): {score}, Hand type: {handtype}")
     
     # --- Step 5: Analyze hand improvements for sample river ---
     print(f"\n--- Analysis for river: {river} ---")
-    analysis_results = analyze_players_for_river(players_df, river)
+    analysis_results = analyze_players_for_river(records, river)
     
     print("Player improvements (sorted by improvement):")
     for result in analysis_results:
         print(f"Player {result['player_no']}: {result['player_cards']} -> "
-              f"{result['hand_type']} (score: {result['player_score']}, "
+              f"{rank_class_string(result['player_score'])} (score: {result['player_score']}, "
               f"improvement: {result['improvement']:+d})")
     
     # --- Find best and worst performing players for this river ---
@@ -251,9 +728,9 @@ if __name__ == "__main__":
     
     # --- Sample analysis for multiple rivers ---
     print("\n--- Quick analysis of first 5 river combinations ---")
-    for i in range(min(5, len(river_combos))):
-        river = list(river_combos[i])
-        results = analyze_players_for_river(players_df, river)
+    for i in range(min(5, len(masks))):
+        river = mask_cards(masks[i])
+        results = analyze_players_for_river(records, river)
         best = results[0]
         worst = results[-1]
         improvement_range = best['improvement'] - worst['improvement']
@@ -264,7 +741,7 @@ if __name__ == "__main__":
     
     # --- Step 6: Validate sample river against player evaluations ---
     print(f"\n--- Validation for sample river: {river} ---")
-    validation = validate_river_against_evaluations(players_df, river)
+    validation = validate_river_against_evaluations(records, river)
     
     print(f"River is {'VALID' if validation['is_valid'] else 'INVALID'}")
     print(f"Conflicts: {len(validation['conflicts'])}")
@@ -282,8 +759,8 @@ if __name__ == "__main__":
     print("\n--- Analyzing ONE specific river from middle of list ---")
     
     # Pick a river from the middle of the list
-    middle_index = len(river_combos) // 2
-    debug_river = list(river_combos[middle_index])
+    middle_index = len(masks) // 2
+    debug_river = mask_cards(masks[middle_index])
     print(f"Debug river (index {middle_index}): {debug_river}")
     
     print("\n--- Player evaluations from CSV ---")
@@ -291,16 +768,16 @@ if __name__ == "__main__":
         print(f"Player {row['Player No']}: {row['Card 1']}, {row['Card 2']} -> Estimation: {row['Estimation']}")
     
     print(f"\n--- Detailed analysis for river {debug_river} ---")
-    analysis_results = analyze_players_for_river(players_df, debug_river)
+    analysis_results = analyze_players_for_river(records, debug_river)
     
     for result in analysis_results:
         player_no = result['player_no']
-        player_evaluation = players_df[players_df['Player No'] == player_no]['Estimation'].iloc[0]
+        player_evaluation = players.est[players.idx_of_player[player_no]]
         improvement = result['improvement']
         improved = improvement > 0
         
         print(f"Player {player_no}: {result['player_cards']}")
-        print(f"  -> {result['hand_type']} (score: {result['player_score']})")
+        print(f"  -> {rank_class_string(result['player_score'])} (score: {result['player_score']})")
         print(f"  -> Improvement: {improvement:+d} (improved: {improved})")
         print(f"  -> CSV evaluation: {player_evaluation}")
         
@@ -315,7 +792,7 @@ if __name__ == "__main__":
         print()
     
     print("--- Full validation check ---")
-    validation = validate_river_against_evaluations(players_df, debug_river)
+    validation = validate_river_against_evaluations(records, debug_river)
     print(f"Is valid: {validation['is_valid']}")
     print(f"Conflicts: {len(validation['conflicts'])}")
     print(f"Matches: {len(validation['matches'])}")
@@ -329,5 +806,11 @@ if __name__ == "__main__":
         for conflict in validation['conflicts']:
             print(f"  - {conflict}")
     
-    print(f"\nRiver baseline (5-card): {hand_class(debug_river)} (score: {evaluate_hand(debug_river)})")
+    baseline_score = evaluate_hand(debug_river)
+    print(f"\nRiver baseline (5-card): {rank_class_string(baseline_score)} (score: {baseline_score})")
 
+    # --- Step 8: Search every river for ones consistent with all evaluations ---
+    print("\n--- Searching all rivers ---")
+    valid_rivers = find_valid_rivers(records, remaining_deck)
+    for entry in valid_rivers[:10]:
+        print(f"  {entry['river']}")
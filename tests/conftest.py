@@ -0,0 +1,11 @@
+import os
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def records():
+    csv_path = os.path.join(os.path.dirname(os.path.abspath(main.__file__)), "player_hands.csv")
+    return main.players_to_records(main.load_players(csv_path))
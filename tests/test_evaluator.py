@@ -0,0 +1,61 @@
+import itertools
+
+import numpy as np
+import pytest
+from numba import njit
+
+import main
+
+# The last (weakest) hand of each class, plus the royal flush at rank 1
+BOUNDARY_HANDS = [
+    (1, ["As", "Ks", "Qs", "Js", "Ts"], "Straight Flush"),
+    (10, ["5h", "4h", "3h", "2h", "Ah"], "Straight Flush"),
+    (166, ["2s", "2h", "2d", "2c", "3s"], "Four of a Kind"),
+    (322, ["2s", "2h", "2d", "3c", "3s"], "Full House"),
+    (1599, ["7s", "5s", "4s", "3s", "2s"], "Flush"),
+    (1609, ["5s", "4h", "3d", "2c", "Ac"], "Straight"),
+    (2467, ["2s", "2h", "2d", "4c", "3s"], "Three of a Kind"),
+    (3325, ["3s", "3h", "2d", "2c", "4s"], "Two Pair"),
+    (6185, ["2s", "2h", "5d", "4c", "3s"], "Pair"),
+    (7462, ["7s", "5h", "4d", "3c", "2s"], "High Card"),
+]
+
+
+@pytest.mark.parametrize("rank, cards, class_name", BOUNDARY_HANDS)
+def test_class_boundary_ranks(rank, cards, class_name):
+    card_ints = [main.to_card_int(card) for card in cards]
+    assert main._eval5(*card_ints, *main.EVAL_TABLES) == rank
+    assert main.rank_class_string(rank) == class_name
+
+
+@njit
+def _eval5_all(hands, flush_lut, unique_lut, hash_adjust, hash_values):
+    ranks = np.empty(hands.shape[0], dtype=np.int64)
+    for i in range(hands.shape[0]):
+        h = hands[i]
+        ranks[i] = main._eval5(h[0], h[1], h[2], h[3], h[4], flush_lut, unique_lut, hash_adjust, hash_values)
+    return ranks
+
+
+def test_eval5_covers_all_7462_ranks():
+    cards = [main.to_card_int(card) for card in main.deck]
+    hands = np.fromiter(itertools.chain.from_iterable(itertools.combinations(cards, 5)),
+                        dtype=np.uint32).reshape(-1, 5)
+    ranks = _eval5_all(hands, *main.EVAL_TABLES)
+    assert len(ranks) == 2598960
+    assert len(np.unique(ranks)) == 7462
+    assert ranks.min() == 1 and ranks.max() == 7462
+
+
+@pytest.mark.parametrize("river", [
+    ["Ts", "Js", "Qs", "Ks", "As"],
+    ["10S", "JS", "QS", "KS", "AS"],
+    [" Ts", "Js ", "Qs", "Ks", "As"],
+])
+def test_river_analysis_accepts_any_card_spelling(records, river):
+    canonical = ["10s", "Js", "Qs", "Ks", "As"]
+    expected = main.analyze_players_for_river(records, canonical)
+    assert len(expected) == 8
+    assert main.analyze_players_for_river(records, river) == expected
+    assert main.validate_river_against_evaluations(records, river) == \
+        main.validate_river_against_evaluations(records, canonical)
@@ -0,0 +1,140 @@
+import itertools
+import math
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import main
+
+# Known hole cards with a mix of happy, sad and neutral players
+PLAYERS = [
+    (1, "Ah", "Kd", 1),
+    (2, "2s", "7d", -1),
+    (3, "Qh", "Jh", 0),
+    (4, "9c", "9d", 1),
+]
+
+
+# players_to_records output for (player_no, card 1, card 2, estimation) rows
+def _records(players):
+    df = pd.DataFrame(players, columns=["Player No", "Card 1", "Card 2", "Estimation"])
+    return main.players_to_records(df)
+
+
+# A seeded sample of n cards left over after the PLAYERS hole cards
+def _small_deck(n, seed=0):
+    df = pd.DataFrame(PLAYERS, columns=["Player No", "Card 1", "Card 2", "Estimation"])
+    remaining_deck = main.build_exclusion_table(df)["remaining_deck"]
+    return random.Random(seed).sample(remaining_deck, n)
+
+
+@pytest.mark.parametrize("n", [0, 3, 4, 5, 6, 9, 17])
+def test_river_masks_enumerate_every_5_card_subset(n):
+    subset = random.Random(n).sample(main.deck, n)
+    subset_mask = sum(1 << main.CARD_BIT[card] for card in subset)
+    masks = main.river_masks(subset).tolist()
+    assert len(masks) == math.comb(n, 5)
+    assert len(set(masks)) == len(masks)
+    for mask in masks:
+        assert bin(mask).count("1") == 5
+        assert mask & subset_mask == mask
+        assert sorted(main.mask_cards(mask)) == sorted(c for c in subset if mask >> main.CARD_BIT[c] & 1)
+
+
+def test_river_masks_full_deck():
+    masks = main.river_masks(main.deck)
+    assert len(masks) == math.comb(52, 5)
+    assert len(np.unique(masks)) == len(masks)
+    assert (np.bitwise_count(masks) == 5).all()
+    assert masks.min() >= 0 and masks.max() < 1 << 52
+
+
+def test_find_valid_rivers_matches_validation():
+    records = _records(PLAYERS)
+    remaining_deck = _small_deck(16)
+    expected = []
+    for mask in main.river_masks(remaining_deck):
+        river = main.mask_cards(mask)
+        if main.validate_river_against_evaluations(records, river)["is_valid"]:
+            expected.append(river)
+    assert 0 < len(expected) < math.comb(16, 5)
+
+    valid_rivers = main.find_valid_rivers(records, remaining_deck)
+    assert [result["river"] for result in valid_rivers] == expected
+    assert all(result["validation"]["is_valid"] for result in valid_rivers)
+
+
+# scan_rivers over river masks for (card 1, card 2, estimation) players
+def _scan(masks, players):
+    player_cards = np.array([[main.to_card_int(c1), main.to_card_int(c2)] for c1, c2, _ in players],
+                            dtype=np.uint32).reshape(-1, 2)
+    estimations = np.array([est for _, _, est in players], dtype=np.int8)
+    return main.scan_rivers(masks, main.BIT_CARDS, player_cards, estimations, main.BOARD_4_OF_5,
+                            main.BOARD_3_OF_5, *main.EVAL_TABLES)
+
+
+# Whether the hole cards beat the board alone, straight from the scalar evaluator
+def _improves(hole, river):
+    b = [main.to_card_int(c) for c in river]
+    p0, p1 = (main.to_card_int(c) for c in hole)
+    return main._eval7(p0, p1, *b, *main.EVAL_TABLES) < main._eval5(*b, *main.EVAL_TABLES)
+
+
+@pytest.mark.parametrize("hole, river", [
+    (("Ah", "Kh"), ["2h", "7h", "9h", "Qs", "3c"]),
+    (("Ah", "Kh"), ["2h", "7h", "9s", "Qs", "3c"]),
+    (("Ah", "2c"), ["3h", "7h", "9h", "Jh", "Kc"]),
+    (("2s", "2c"), ["3h", "7h", "9h", "Jh", "Kc"]),
+    (("5d", "6d"), ["7d", "8d", "Kd", "Ks", "Kc"]),
+    (("Qh", "Jh"), ["10h", "9h", "8h", "2c", "3d"]),
+    (("Ah", "3c"), ["4h", "7h", "9h", "Jh", "Kh"]),
+    (("2h", "3h"), ["4h", "7h", "9h", "Jh", "Kh"]),
+])
+def test_scan_rivers_flush_boards(hole, river):
+    masks = np.array([sum(1 << main.CARD_BIT[c] for c in river)], dtype=np.int64)
+    improved = _improves(hole, river)
+    records = _records([(1, *hole, 1), (2, "??", "??", 0)])
+    assert main.validate_river_against_evaluations(records, river)["is_valid"] == improved
+    assert bool(_scan(masks, [(*hole, 1)])[0]) == improved
+    assert bool(_scan(masks, [(*hole, -1)])[0]) == (not improved)
+
+
+def test_scan_rivers_flush_heavy_deck():
+    holes = [("Ah", "Kh"), ("2h", "7h"), ("Qc", "3h"), ("4c", "5c")]
+    dead = {card for hole in holes for card in hole}
+    remaining_deck = [card for card in main.deck if card[-1] in "hc" and card not in dead]
+    masks = main.river_masks(remaining_deck)
+    rivers = [main.mask_cards(mask) for mask in masks]
+    for hole in holes:
+        expected = [_improves(hole, river) for river in rivers]
+        assert 0 < sum(expected) < len(rivers)
+        assert _scan(masks, [(*hole, 1)]).astype(bool).tolist() == expected
+
+
+def test_scan_rivers_ignores_player_order():
+    masks = main.river_masks(_small_deck(18))
+    players = [(c1, c2, est) for _, c1, c2, est in PLAYERS]
+    expected = _scan(masks, players)
+    assert 0 < expected.sum() < len(masks)
+    # Every seating, so the neutral player comes first, in the middle and last
+    for order in itertools.permutations(players):
+        assert (_scan(masks, list(order)) == expected).all()
+
+
+def test_find_valid_rivers_process_pool_matches_in_process():
+    records = _records(PLAYERS)
+    remaining_deck = _small_deck(16, seed=1)
+    in_process = main.find_valid_rivers(records, remaining_deck)
+    pooled = main.find_valid_rivers(records, remaining_deck, processes=2)
+    assert in_process
+    assert pooled == in_process
+
+
+@pytest.mark.parametrize("river", [["As", "Kd", "7c", "3h", "2s"], ["10h", "9h", "8h", "2c", "3d"]])
+def test_validation_analysis_is_unsorted_analyze_view(records, river):
+    analysis = main.validate_river_against_evaluations(records, river)["analysis"]
+    assert [result["player_no"] for result in analysis] == [r[0] for r in records if r[1] and r[2]]
+    assert sorted(analysis, key=lambda result: -result["improvement"]) == \
+        main.analyze_players_for_river(records, river)
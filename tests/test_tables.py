@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+import pytest
+
+import main
+
+
+@pytest.fixture(scope="module")
+def fresh_tables():
+    flush_lookup, unique5_lookup, product_lookup = main.build_tables()
+    hash_adjust, hash_values = main.build_product_hash(product_lookup)
+    return flush_lookup, unique5_lookup, hash_adjust, hash_values
+
+
+# Same layout as TABLE_LAYOUT and the same contents as a fresh build
+def _assert_tables_equal(tables, expected):
+    assert len(tables) == len(expected)
+    for table, (name, (shape, dtype)), want in zip(tables, main.TABLE_LAYOUT.items(), expected):
+        assert table.shape == shape and table.dtype == dtype, name
+        assert np.array_equal(table, want), name
+
+
+# Overwrite a table with the right shape and dtype but one flipped entry
+def _flip_entry(path):
+    table = np.array(np.load(path))
+    table[5] ^= 1
+    np.save(path, table)
+
+
+# Keep only the start of the .npy header
+def _truncate(path):
+    with open(path, "r+b") as fh:
+        fh.truncate(20)
+
+
+# Replace a table with one of the right length but the wrong dtype
+def _wrong_dtype(path):
+    np.save(path, np.zeros(8192, dtype=np.int32))
+
+
+@pytest.mark.parametrize("name, damage", [
+    ("flush_lookup", _flip_entry),
+    ("unique5_lookup", _truncate),
+    ("hash_values", _wrong_dtype),
+    ("checksums", os.remove),
+])
+def test_damaged_tables_are_rebuilt(tmp_path, fresh_tables, name, damage):
+    _assert_tables_equal(main.build_or_load_tables(str(tmp_path)), fresh_tables)
+    ext = "txt" if name == "checksums" else "npy"
+    damage(os.path.join(tmp_path, f"{name}.v{main.TABLES_VERSION}.{ext}"))
+    assert main._load_tables(str(tmp_path)) is None
+
+    tables = main.build_or_load_tables(str(tmp_path))
+    _assert_tables_equal(tables, fresh_tables)
+    assert all(isinstance(table, np.memmap) for table in tables)
+    assert main._load_tables(str(tmp_path)) is not None
+
+
+def test_unwritable_directory_builds_in_memory(tmp_path, fresh_tables):
+    # A path under a regular file can never be created, even by root
+    blocker = tmp_path / "not_a_dir"
+    blocker.write_text("")
+    tables = main.build_or_load_tables(str(blocker / "cactus_tables"))
+    _assert_tables_equal(tables, fresh_tables)